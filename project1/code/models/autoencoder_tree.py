@@ -1,11 +1,14 @@
 from typing import Literal
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras import Model, Sequential
-from tensorflow.keras.layers import Conv1D, Conv1DTranspose, Flatten
+from tensorflow.keras import Sequential
+from tensorflow.keras.layers import (Activation, Conv1D, Conv1DTranspose,
+                                     GlobalAveragePooling1D)
 from tensorflow.keras.optimizers import Adam
-from sklearn.model_selection import train_test_split
+from tensorflow.keras.callbacks import EarlyStopping
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.preprocessing import KBinsDiscretizer
 
 from datasets import load_arrhythmia_dataset, load_PTB_dataset
 from utils import upsample, get_debug_data, set_seeds
@@ -14,10 +17,28 @@ DEBUG = False
 UPSAMPLE = False
 VALIDATION_SPLIT = 0.1
 BATCH_SIZE = 128
+PREDICT_BATCH_SIZE = 1024
 EPOCHS = 3
 EARLY_STOPPING_PATIENCE = 2
 FILTER_SIZE = 3
+N_ESTIMATORS = 100
+ESTIMATORS_PER_FIT = 10
+N_BINS = 256
+MIXED_PRECISION = True
 SEED = 1337
+# Signals of length 187 padded with a single zero
+INPUT_SHAPE = (188, 1)
+
+
+
+def _cuda_available() -> bool:
+    """Whether TensorFlow can run on a CUDA GPU.
+
+    Other GPU backends, such as the Metal plugin, are also listed as
+    GPUs but support neither XLA nor fp16 Tensor Core kernels.
+    """
+    return (tf.test.is_built_with_cuda() and
+            bool(tf.config.list_physical_devices('GPU')))
 
 
 class AutoencoderTree:
@@ -42,39 +63,122 @@ class AutoencoderTree:
 
         self.init_autoencoder()
         self.load_data(dataset)
-        self.clf = ExtraTreesClassifier(n_estimators=100)
+
+    def init_classifier(self):
+        """Creates an empty classifier to be grown with warm starts."""
+        self.clf = ExtraTreesClassifier(n_estimators=0,
+                                        warm_start=True,
+                                        n_jobs=-1,
+                                        bootstrap=True,
+                                        max_samples=0.5,
+                                        max_features='sqrt',
+                                        min_samples_leaf=2,
+                                        random_state=SEED)
 
     def init_autoencoder(self):
-        input_shape = (188, 1)
+        """Builds and compiles the convolutional autoencoder.
+
+        Global options:
+            MIXED_PRECISION: if set to true and a CUDA GPU is
+                available, the convolutions are computed in float16 so
+                that cuDNN can dispatch Tensor Core kernels. Filter
+                counts are kept at multiples of 8 for the same reason.
+                The reconstruction is cast back to float32 before the
+                loss is computed.
+        """
+        # XLA is only used on CUDA, as e.g. tensorflow-metal lacks it
+        self.use_xla = _cuda_available()
+        use_fp16 = MIXED_PRECISION and self.use_xla
+        dtype = 'mixed_float16' if use_fp16 else 'float32'
 
         self.autoencoder = Sequential([
+            Conv1D(16,
+                   FILTER_SIZE,
+                   strides=2,
+                   activation='relu',
+                   padding='same',
+                   input_shape=INPUT_SHAPE,
+                   dtype=dtype),
             Conv1D(8,
                    FILTER_SIZE,
                    strides=2,
                    activation='relu',
                    padding='same',
-                   input_shape=input_shape),
-            Conv1D(2, FILTER_SIZE, strides=2, activation='relu',
-                   padding='same'),
-            Conv1DTranspose(2, FILTER_SIZE, strides=2, padding='same'),
-            Conv1DTranspose(8, FILTER_SIZE, strides=2, padding='same'),
-            Conv1DTranspose(1, 1, strides=1, padding='same')
+                   dtype=dtype),
+            Conv1DTranspose(8,
+                            FILTER_SIZE,
+                            strides=2,
+                            padding='same',
+                            dtype=dtype),
+            Conv1DTranspose(16,
+                            FILTER_SIZE,
+                            strides=2,
+                            padding='same',
+                            dtype=dtype),
+            Conv1DTranspose(1, 1, strides=1, padding='same', dtype=dtype),
+            Activation('linear', dtype='float32')
         ])
 
+        optimizer = Adam(0.001)
+        if use_fp16:
+            # compile() only adds loss scaling when the model's own policy
+            # is mixed, which is not the case with per-layer policies
+            optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+
+        # The model is tiny, so steps are dominated by op dispatch rather
+        # than FLOPs; XLA compiles the whole train step into fused kernels
         self.autoencoder.compile(loss='mse',
-                                 optimizer=Adam(0.001),
-                                 metrics=['mse'])
+                                 optimizer=optimizer,
+                                 metrics=['mse'],
+                                 jit_compile=self.use_xla)
+
+    def _make_dataset(self,
+                      X: np.ndarray,
+                      shuffle: bool = True) -> tf.data.Dataset:
+        """Builds a cached, shuffled and prefetched input pipeline.
+
+        The next batch is staged while the current one is trained on,
+        overlapping host-to-device copies with compute.
+
+        Args:
+            X: Signals used both as inputs and reconstruction targets.
+            shuffle: Whether to shuffle the samples and drop the last
+                incomplete batch, unless it is the only one. Disabled
+                for validation data.
+
+        Returns:
+            Dataset yielding (input, target) batches.
+        """
+        options = tf.data.Options()
+        options.experimental_optimization.map_and_batch_fusion = True
+        options.deterministic = False
+
+        # The array is embedded once and paired with itself per element
+        ds = tf.data.Dataset.from_tensor_slices(X)
+        ds = ds.cache()
+        if shuffle:
+            ds = ds.shuffle(8 * BATCH_SIZE, seed=SEED)
+        ds = ds.map(lambda x: (x, x))
+        # Small sets (e.g. in DEBUG mode) would otherwise yield no batches
+        drop_remainder = shuffle and len(X) >= BATCH_SIZE
+        ds = ds.batch(BATCH_SIZE, drop_remainder=drop_remainder)
+        ds = ds.prefetch(tf.data.AUTOTUNE)
+        return ds.with_options(options)
 
     def _pad(self, X):
-        return np.append(X, np.zeros((X.shape[0], 1, 1)), axis=1)
+        out = np.empty((X.shape[0], X.shape[1] + 1, X.shape[2]),
+                       dtype=np.float32)
+        out[:, :-1] = X
+        out[:, -1] = 0
+        return out
 
     def load_data(self, dataset: Literal['mithb', 'ptbdb']) -> None:
         """Loads and splits the dataset.
 
         The train and test datasets are loaded from files. Each sample
-        is padded with an extra zero to make the dimension divisible
-        by 2. The train dataset is then split into a train and a
-        validation dataset.
+        is cast to float32 and padded with an extra zero to make the
+        dimension divisible by 2. The train dataset is then split into
+        a train and a validation dataset.
 
         Global options:
             DEBUG: if set to true, a small subsample of the dataset
@@ -99,10 +203,14 @@ class AutoencoderTree:
         else:
             raise ValueError(dataset, 'is not a valid dataset')
 
-        X, X_test, X_mit, X_ptb = self._pad(X), self._pad(X_test), self._pad(
-            X_mit), self._pad(X_ptb)
-        X_train, X_valid, y_train, y_valid = train_test_split(
-            X, y, test_size=VALIDATION_SPLIT, stratify=y)
+        X, X_test = self._pad(X), self._pad(X_test)
+        splitter = StratifiedShuffleSplit(n_splits=1,
+                                          test_size=VALIDATION_SPLIT,
+                                          random_state=SEED)
+        train_idx, valid_idx = next(splitter.split(np.zeros(len(y)), y))
+        X_train, X_valid = X[train_idx], X[valid_idx]
+        y_train, y_valid = y[train_idx], y[valid_idx]
+        X_train_ae, y_train_ae = X_train, y_train
 
         if DEBUG:
             X_train, y_train, X_valid, y_valid, X_test, y_test = get_debug_data(
@@ -119,29 +227,105 @@ class AutoencoderTree:
         self.y_test = y_test
 
         # The autoencoder does not need labels, so we can use all data
-        self.X_train_full = np.concatenate((X_mit, X_ptb), axis=0)
-        self.y_train_full = np.concatenate((y_mit, y_ptb), axis=0)
+        # except the validation rows, which are kept out for early
+        # stopping. The already padded training rows and the other,
+        # unpadded dataset are copied directly into a preallocated
+        # buffer.
+        if dataset == 'mithb':
+            parts = [(X_train_ae, y_train_ae), (X_ptb, y_ptb)]
+        else:
+            parts = [(X_mit, y_mit), (X_train_ae, y_train_ae)]
+        n_full = sum(len(y_part) for _, y_part in parts)
+        X_train_full = np.empty((n_full, *INPUT_SHAPE), dtype=np.float32)
+        y_train_full = np.empty(n_full, dtype=y.dtype)
+        start = 0
+        for X_part, y_part in parts:
+            end = start + len(y_part)
+            X_train_full[start:end, :X_part.shape[1]] = X_part
+            y_train_full[start:end] = y_part
+            start = end
+        X_train_full[:, -1] = 0
+
+        self.X_train_full = X_train_full
+        self.y_train_full = y_train_full
 
     def train(self):
         print('Fitting autoencoder...')
         X_train_ae = self.X_train_full if self.train_ae_on == 'full' else self.X_train
-        self.autoencoder.fit(X_train_ae,
-                             X_train_ae,
-                             batch_size=BATCH_SIZE,
-                             shuffle=True,
-                             epochs=EPOCHS)
+        early_stopping = EarlyStopping(monitor='val_loss',
+                                       patience=EARLY_STOPPING_PATIENCE,
+                                       restore_best_weights=True)
+        self.autoencoder.fit(self._make_dataset(X_train_ae),
+                             validation_data=self._make_dataset(self.X_valid,
+                                                                shuffle=False),
+                             epochs=EPOCHS,
+                             callbacks=[early_stopping])
 
         print('Generating training features...')
-        flat = Flatten()(self.autoencoder.layers[1].output)
-        self.featurizer = Model(self.autoencoder.input, flat)
+        # The encoder half is rebuilt as its own model so that XLA can
+        # fuse the convolutions and the pooling into a single kernel.
+        # Pooling over time yields one feature per latent channel.
+        self.featurizer = Sequential(
+            self.autoencoder.layers[:2] +
+            [GlobalAveragePooling1D(dtype='float32')])
+        # A fixed signature lets every batch size reuse one traced graph
+        self._featurizer_fn = tf.function(
+            lambda x: self.featurizer(x, training=False),
+            input_signature=[tf.TensorSpec([None, *INPUT_SHAPE], tf.float32)],
+            jit_compile=self.use_xla)
 
-        X_train = self.featurizer.predict(self.X_train)
+        X_train = self.featurize(self.X_train)
+        self.discretizer = KBinsDiscretizer(n_bins=N_BINS,
+                                            encode='ordinal',
+                                            strategy='quantile',
+                                            dtype=np.float32)
+        # Quantized once; float32 codes are used by the trees without
+        # further conversion on each warm-started fit
+        X_train = self.discretizer.fit_transform(X_train)
 
         print('Fitting classifier...')
-        self.clf.fit(X_train, self.y_train)
+        # Trees are grown incrementally to bound peak memory during fit.
+        # A fresh classifier is created so retraining starts from zero.
+        self.init_classifier()
+        while self.clf.n_estimators < N_ESTIMATORS:
+            self.clf.n_estimators += ESTIMATORS_PER_FIT
+            self.clf.fit(X_train, self.y_train)
+
+    def featurize(self, X: np.ndarray) -> np.ndarray:
+        """Projects padded signals into the latent space of the encoder.
+
+        Runs a compiled forward pass over a prefetched dataset instead
+        of going through Keras' predict loop.
+
+        Args:
+            X: Padded signals.
+
+        Returns:
+            Pooled encoder features.
+        """
+        ds = tf.data.Dataset.from_tensor_slices(X).batch(PREDICT_BATCH_SIZE)
+        ds = ds.prefetch(tf.data.AUTOTUNE)
+        X_feat = np.concatenate([self._featurizer_fn(x).numpy() for x in ds])
+        # sklearn trees work in float32, so this avoids an upcast copy
+        return X_feat.astype(np.float32, copy=False)
+
+    def quantize(self, X_feat: np.ndarray) -> np.ndarray:
+        """Bins encoder features into at most N_BINS ordinal codes.
+
+        Trees only depend on the ordering of feature values, so the
+        features are mapped to quantile bins fitted on the training
+        set before being passed to the classifier.
+
+        Args:
+            X_feat: Features returned by featurize.
+
+        Returns:
+            Bin indices as float32, the dtype sklearn trees work in.
+        """
+        return self.discretizer.transform(X_feat)
 
     def predict(self):
-        X_test = self.featurizer.predict(self.X_test)
+        X_test = self.quantize(self.featurize(self.X_test))
         self.y_pred = self.clf.predict(X_test)
         self.y_pred_proba = self.clf.predict_proba(X_test)
 
@@ -91,8 +91,9 @@ class Ensemble:
             (
                 self.attention_model.clf.predict(X),
                 self.autoencoder_tree_model.clf.predict_proba(
-                    (self.autoencoder_tree_model.featurizer.predict(
-                        self.autoencoder_tree_model._pad(X)))),
+                    self.autoencoder_tree_model.quantize(
+                        self.autoencoder_tree_model.featurize(
+                            self.autoencoder_tree_model._pad(X)))),
                 get_preds_from_numpy(self.vanilla_cnn_model,
                                      self.vanilla_cnn_trainer, X),
                 get_preds_from_numpy(self.resnet_model, self.resnet_trainer, X),
@@ -119,7 +120,7 @@ class Ensemble:
         X_feats = np.concatenate(
             (
                 attention_model_features.predict(X),
-                self.autoencoder_tree_model.featurizer.predict(
+                self.autoencoder_tree_model.featurize(
                     self.autoencoder_tree_model._pad(X)),
                 get_cnn_outputs(self.vanilla_cnn_model, X),
                 get_preds_from_numpy(
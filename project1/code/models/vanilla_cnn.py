@@ -14,6 +14,12 @@ import numpy as np
 from torch.utils.data import DataLoader, TensorDataset, random_split
 from config import USE_GPU
 
+SEED = 2137
+# Memory-mapped loading requires torch >= 2.1
+TORCH_VERSION = tuple(int(v) for v in torch.__version__.split(".")[:2])
+CACHE_DIR = pathlib.Path(__file__).parents[1].joinpath("saved_models",
+                                                       "dataset_cache")
+
 
 class vanillaCNN(pl.LightningModule):
 
@@ -41,27 +47,23 @@ class vanillaCNN(pl.LightningModule):
         self.accuracy = torchmetrics.Accuracy()
 
     def forward(self, x):
-        x.unsqueeze_(1)
-        x = self.net(x)
-
-        dims = x.shape
-        x = x.view(-1, dims[1] * dims[2])
+        # Training data is stored channels first; raw (N, L) batches,
+        # e.g. from get_preds_from_numpy, still need a channel dim
+        if x.dim() == 2:
+            x = x.unsqueeze(1)
+        x = self.net(x).flatten(1)
         x = self.fc(x)
         return x
 
     def training_step(self, batch, batch_idx):
         x, y = batch
-        x.unsqueeze_(1)
 
-        output_cnn = self.net(x)
-
-        dims = output_cnn.shape
-        output_cnn = output_cnn.view(-1, dims[1] * dims[2])
+        output_cnn = self.net(x).flatten(1)
         output = self.fc(output_cnn)
 
         if self.no_classes == 2:
             output = output.squeeze()
-            loss = F.binary_cross_entropy(torch.sigmoid(output), y)
+            loss = F.binary_cross_entropy_with_logits(output, y)
         else:
             loss = F.cross_entropy(output, y)
         self.log("train_loss", loss)
@@ -73,14 +75,22 @@ class vanillaCNN(pl.LightningModule):
 
         if self.no_classes == 2:
             y_hat = y_hat.squeeze()
+            val_loss = F.binary_cross_entropy_with_logits(y_hat, y)
             y_hat = torch.sigmoid(y_hat)
-            val_loss = F.binary_cross_entropy(y_hat, y)
         else:
             val_loss = F.cross_entropy(y_hat, y)
 
         self.log("val_loss", val_loss)
-        self.accuracy(y_hat, y.long())
-        self.log("val_acc", self.accuracy)
+        return {"preds": y_hat.detach(), "targets": y.long()}
+
+    def validation_epoch_end(self, outputs):
+        # Accuracy is reduced once per epoch to avoid a sync on every step
+        preds = torch.cat([output["preds"] for output in outputs])
+        targets = torch.cat([output["targets"] for output in outputs])
+        self.accuracy.update(preds, targets)
+        # compute() syncs the metric state across processes under DDP
+        self.log("val_acc", self.accuracy.compute())
+        self.accuracy.reset()
 
     def predict_step(self, batch, batch_idx):
 
@@ -88,7 +98,9 @@ class vanillaCNN(pl.LightningModule):
             x = batch[0]
         else:
             x, y = batch
-        pred = self.forward(x)
+        # Under 16-bit precision the logits come out of autocast as
+        # float16; callers expect float32 predictions
+        pred = self.forward(x).float()
         if self.no_classes == 2:
             pred = torch.sigmoid(pred)
         return pred
@@ -98,6 +110,59 @@ class vanillaCNN(pl.LightningModule):
         return optimizer
 
 
+def load_cached_datasets(
+        dataset: str) -> tuple[TensorDataset, TensorDataset, TensorDataset]:
+    """Loads prepared datasets from disk, preparing and caching them on a miss.
+
+    Parsing the CSV files dominates the loading time, so the prepared
+    datasets are saved with torch.save and loaded on later runs, memory
+    mapped where the installed torch supports it.
+    Signals are stored channels first, with shape (N, 1, L).
+    The split uses its own seeded generator, so the global torch RNG,
+    and with it weight initialisation, is the same on cache hits and
+    misses.
+    Delete the cache directory to force the datasets to be rebuilt.
+
+    Args:
+        dataset: name of dataset to load, either "mithb" or "ptbdb"
+
+    Raises:
+        ValueError: If provided incorrect dataset name.
+
+    Returns:
+        Dataset splited to train, validation and test sets.
+    """
+    cache_path = CACHE_DIR.joinpath(f"{dataset}_ncl.pt")
+    if cache_path.exists():
+        if TORCH_VERSION >= (2, 1):
+            return torch.load(cache_path, weights_only=False, mmap=True)
+        return torch.load(cache_path)
+
+    if dataset == "mithb":
+        x, y, x_test, y_test = load_arrhythmia_dataset()
+        y_dtype = torch.long
+    elif dataset == "ptbdb":
+        x, y, x_test, y_test = load_PTB_dataset()
+        y_dtype = torch.float
+    else:
+        raise ValueError("Incorrect dataset!")
+
+    # Store signals contiguously as (N, 1, L), the layout nn.Conv1d expects
+    x = np.ascontiguousarray(x.transpose(0, 2, 1), dtype=np.float32)
+    x_test = np.ascontiguousarray(x_test.transpose(0, 2, 1), dtype=np.float32)
+    datasets = prepare_datasets(x,
+                                y,
+                                x_test,
+                                y_test,
+                                squeeze=False,
+                                y_dtype=y_dtype,
+                                generator=torch.Generator().manual_seed(SEED))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save(datasets, cache_path)
+    return datasets
+
+
 def train_vanilla_cnn(
     channels: list[int],
     kernel_size: int,
@@ -107,6 +172,10 @@ def train_vanilla_cnn(
 ) -> tuple[pl.LightningModule, pl.Trainer]:
     """Trains vanilla CNN model on selected dataset.
 
+    When training on a GPU, the model is trained in 16-bit mixed
+    precision and output channels of every layer are rounded up to a
+    multiple of 8 so that cuDNN can use Tensor Cores.
+
     Args:
         channels: list of channels for each layer
         kernel_size: kernel size for all layers
@@ -120,27 +189,45 @@ def train_vanilla_cnn(
     Returns:
         Trained model and trainer.
     """
+    use_fp16 = bool(USE_GPU)
+    if use_fp16:
+        channels = [channels[0]] + [-(-c // 8) * 8 for c in channels[1:]]
 
     if dataset == "mithb":
-        x, y, x_test, y_test = load_arrhythmia_dataset()
-        train_dataset, val_dataset, test_dataset = prepare_datasets(
-            x, y, x_test, y_test, True)
-        model = vanillaCNN(channels, kernel_size,
-                           channels[-1] * cnn_output_size, 5)
+        no_classes = 5
     elif dataset == "ptbdb":
-        x, y, x_test, y_test = load_PTB_dataset()
-        train_dataset, val_dataset, test_dataset = prepare_datasets(
-            x, y, x_test, y_test, True, y_dtype=torch.float)
-        model = vanillaCNN(channels, kernel_size,
-                           channels[-1] * cnn_output_size, 2)
+        no_classes = 2
     else:
         raise ValueError("Incorrect dataset!")
 
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=64)
+    train_dataset, val_dataset, test_dataset = load_cached_datasets(dataset)
+    model = vanillaCNN(channels, kernel_size, channels[-1] * cnn_output_size,
+                       no_classes)
+
+    if hasattr(torch, "compile"):
+        model.net = torch.compile(model.net)
+
+    train_loader = DataLoader(
+        train_dataset,
+        batch_size=32,
+        shuffle=True,
+        num_workers=4,
+        persistent_workers=True,
+        pin_memory=bool(USE_GPU),
+        prefetch_factor=4,
+    )
+    val_loader = DataLoader(
+        val_dataset,
+        batch_size=64,
+        num_workers=2,
+        persistent_workers=True,
+        pin_memory=bool(USE_GPU),
+    )
 
     trainer = pl.Trainer(
         gpus=USE_GPU,
+        precision=16 if use_fp16 else 32,
+        benchmark=True,
         max_epochs=max_epochs,
         callbacks=[EarlyStopping(monitor="val_loss", mode="min")],
         default_root_dir=pathlib.Path(__file__).parents[1].joinpath(
@@ -163,11 +250,22 @@ def get_cnn_outputs(model: vanillaCNN, X: np.ndarray) -> np.ndarray:
     Returns:
         Flattend features from last convolutional layer of the model, for a given input data.
     """
-    datset = TensorDataset(torch.tensor(X, dtype=torch.float).squeeze())
-    loader = DataLoader(dataset=datset, batch_size=64)
+    use_cuda = bool(USE_GPU) and torch.cuda.is_available()
+    device = torch.device("cuda" if use_cuda else "cpu")
+
+    X = torch.from_numpy(np.ascontiguousarray(X.transpose(0, 2, 1),
+                                              dtype=np.float32))
+    if use_cuda:
+        X = X.pin_memory()
+    model.net.eval().to(device)
+
+    chunk_size = 4096
     outputs = []
-    for x in loader:
-        outputs.append(torch.flatten(model.net(x[0].unsqueeze(1)), start_dim=1))
+    with torch.inference_mode(), torch.autocast(device.type,
+                                                enabled=use_cuda):
+        for i in range(0, X.shape[0], chunk_size):
+            x = X[i:i + chunk_size].to(device, non_blocking=True)
+            outputs.append(model.net(x).flatten(1).float().cpu())
 
     cnn_output = torch.cat(outputs, 0)
-    return cnn_output.detach().numpy()
+    return cnn_output.numpy()
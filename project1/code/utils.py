@@ -101,6 +101,7 @@ def prepare_datasets(
     y_test: np.ndarray,
     squeeze: bool = True,
     y_dtype=torch.long,
+    generator: torch.Generator = torch.default_generator,
 ) -> Tuple[TensorDataset, TensorDataset, TensorDataset]:
     """Creates train, validation and test dataset as TensorDataset from provided data in numpy arrays
 
@@ -111,35 +112,42 @@ def prepare_datasets(
         y_test: test labels
         squeeze: if True, squeezes the x before creating dataset. Defaults to True.
         y_dtype: desired type of labels. Defaults to torch.long.
+        generator: generator used for the train/validation split. Defaults to the global generator.
 
     Returns:
         Dataset splited to train, validation and test sets.
     """
 
+    # Cast once here so that batches are float32 without per-step conversion
+    x = torch.from_numpy(x).float()
+    x_test = torch.from_numpy(x_test).float()
+
     if squeeze:
         dataset = TensorDataset(
-            torch.tensor(x, dtype=torch.float).squeeze(),
+            x.squeeze(),
             torch.tensor(y, dtype=y_dtype).squeeze(),
         )
         test_dataset = TensorDataset(
-            torch.tensor(x_test, dtype=torch.float).squeeze(),
+            x_test.squeeze(),
             torch.tensor(y_test, dtype=y_dtype).squeeze(),
         )
     else:
         dataset = TensorDataset(
-            torch.tensor(x, dtype=torch.float),
+            x,
             torch.tensor(y, dtype=y_dtype).squeeze(),
         )
 
         test_dataset = TensorDataset(
-            torch.tensor(x_test, dtype=torch.float),
+            x_test,
             torch.tensor(y_test, dtype=y_dtype).squeeze(),
         )
 
     train_dataset, val_dataset = random_split(
         dataset,
         [int(0.9 * len(dataset)),
-         len(dataset) - int(0.9 * len(dataset))])
+         len(dataset) - int(0.9 * len(dataset))],
+        generator=generator,
+    )
 
     return train_dataset, val_dataset, test_dataset
 